@@ -1,19 +1,318 @@
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import copy
+import asyncio
+import hashlib
+import functools
+import contextlib
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 from google_play_scraper import reviews, app, Sort
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Callable
 import json
 from datetime import datetime
 import anthropic
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Instructions shared by every sentiment request. Kept byte-identical across
+# calls so Claude's prompt cache can reuse the processed prefix.
+STATIC_INSTRUCTIONS = """Analyze the app review sent by the user and record the result with the record_analysis tool:
+- sentiment: positive, negative or neutral
+- topics: topics the review talks about
+- issues: problems the user reports
+- praises: things the user likes"""
+
+# Batched counterpart of STATIC_INSTRUCTIONS, for a JSON array of reviews per request
+BATCH_INSTRUCTIONS = """Analyze each of the app reviews in the JSON array sent by the user and record the results with the record_analyses tool.
+Include exactly one result per array element, in the same order as the array, each with:
+- sentiment: positive, negative or neutral
+- topics: topics the review talks about
+- issues: problems the user reports
+- praises: things the user likes"""
+
+# JSON schema of a single review analysis
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "sentiment": {"type": "string", "enum": ["positive", "negative", "neutral"]},
+        "topics": {"type": "array", "items": {"type": "string"}},
+        "issues": {"type": "array", "items": {"type": "string"}},
+        "praises": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["sentiment", "topics", "issues", "praises"]
+}
+
+# Tools Claude is made to call, so analyses come back as structured input
+# rather than JSON embedded in text
+RECORD_ANALYSIS_TOOL = {
+    "name": "record_analysis",
+    "description": "Record the analysis of an app review.",
+    "input_schema": ANALYSIS_SCHEMA
+}
+RECORD_ANALYSES_TOOL = {
+    "name": "record_analyses",
+    "description": "Record the analyses of the app reviews, one per review in array order.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "results": {"type": "array", "items": ANALYSIS_SCHEMA}
+        },
+        "required": ["results"]
+    }
+}
+
+# Claude model used for all sentiment requests
+CLAUDE_MODEL = "claude-3-7-sonnet-20250219"
+
+# Version of the cached analyses, changing whenever the model, prompts or schema
+# change so earlier analyses are no longer served from the sentiment cache
+SENTIMENT_CACHE_VERSION = hashlib.blake2b(
+    "\0".join([CLAUDE_MODEL, STATIC_INSTRUCTIONS, BATCH_INSTRUCTIONS,
+                json.dumps(ANALYSIS_SCHEMA, sort_keys=True)]).encode('utf-8'),
+    digest_size=8
+).hexdigest()
+
+# Maximum number of Claude requests in flight at once
+MAX_CONCURRENT_REQUESTS = 10
+
+# Number of reviews sent to Claude per request, and the output budget per review
+BATCH_SIZE = 20
+BATCH_TOKENS_PER_REVIEW = 400
+MAX_OUTPUT_TOKENS = 8192
+
+# Timeout of a Claude request: a fixed allowance plus time to generate its
+# max_tokens at a conservative output rate
+REQUEST_TIMEOUT = 30.0
+OUTPUT_TOKENS_PER_SECOND = 50
+
+# Maximum number of review pages read while looking for reviews that pass a score filter
+MAX_REVIEW_PAGES = 10
+
+# Index of generated reports, kept alongside them so history can be listed cheaply
+REPORT_INDEX_FILE = "_index.json"
+
+# Suffix of the small sidecar file holding each report's title and generation date
+REPORT_META_SUFFIX = "_report.meta.json"
+
+# Embedding model and cosine-similarity cutoff for the semantic sentiment cache
+SEMANTIC_CACHE_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SEMANTIC_CACHE_THRESHOLD = 0.92
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def _run(coro):
+    """
+    Run a coroutine to completion on a shared background event loop.
+
+    A single long-lived loop (rather than asyncio.run per call) keeps the async
+    Claude client's pooled connections valid between calls, and works from
+    threads that already run their own loop (e.g. Streamlit sessions).
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
+
+def load_json(path: str):
+    """Read a JSON file, using orjson when it is installed."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+@contextlib.contextmanager
+def _atomic_open(path: str, mode: str = 'w'):
+    """
+    Open a temporary file that replaces path once it is written without errors,
+    so readers never see a partially written file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def dump_json(obj, path: str, indent: bool = True):
+    """Atomically write obj to a JSON file, using orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        with _atomic_open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=option))
+        return
+    with _atomic_open(path, 'w') as f:
+        json.dump(obj, f, indent=2 if indent else None)
+
+@functools.lru_cache(maxsize=8)
+def _read_cache_file(path: str, inode: int, mtime_ns: int) -> Dict[str, Dict]:
+    """Parse a sentiment cache file once per version of it, shared by all analyzers."""
+    return load_json(path)
+
+def _extract_json(response_text: str) -> Dict:
+    """Parse the JSON object embedded in a Claude response."""
+    start_idx = response_text.find('{')
+    end_idx = response_text.rfind('}') + 1
+    
+    if start_idx == -1 or end_idx == 0:
+        raise ValueError("No JSON object found in response")
+        
+    return json.loads(response_text[start_idx:end_idx])
+
+def _response_payload(response) -> Dict:
+    """Return the tool input of a Claude response, falling back to JSON in its text."""
+    for block in response.content:
+        if block.type == "tool_use":
+            return block.input
+    response_text = "".join(block.text for block in response.content if block.type == "text")
+    return _extract_json(response_text.strip())
+
+def _validate_analysis(analysis: Dict) -> Dict:
+    """Check the structure of a single review analysis and normalize its sentiment."""
+    # Validate the response structure
+    required_keys = ["sentiment", "topics", "issues", "praises"]
+    if not all(key in analysis for key in required_keys):
+        raise ValueError("Response missing required keys")
+        
+    # Validate sentiment value
+    if analysis["sentiment"] not in ["positive", "negative", "neutral", "mixed"]:
+        raise ValueError(f"Invalid sentiment value: {analysis['sentiment']}")
+    
+    # Convert mixed sentiment to neutral
+    if analysis["sentiment"] == "mixed":
+        analysis["sentiment"] = "neutral"
+    
+    return analysis
+
+_claude = None
+
+def get_claude() -> anthropic.AsyncAnthropic:
+    """
+    Return the Claude client shared by all analyzers.
+
+    Sharing one client lets every request reuse its pooled connections instead
+    of paying a new TCP and TLS handshake per analyzer. Environment variables
+    from .env are loaded when the client is first created, not on import.
+    """
+    global _claude
+    if _claude is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _claude = anthropic.AsyncAnthropic(
+            api_key=os.getenv('ANTHROPIC_API_KEY'),
+            max_retries=2,
+            timeout=REQUEST_TIMEOUT
+        )
+    return _claude
+
+@functools.lru_cache(maxsize=1)
+def get_encoder():
+    """Load the sentence-transformers model used by the semantic cache, once per process."""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        raise ImportError("semantic_cache=True requires the sentence-transformers package")
+    return SentenceTransformer(SEMANTIC_CACHE_MODEL)
+
+def _fallback_analysis() -> Dict:
+    """Analysis returned when Claude fails to produce a usable response."""
+    return {
+        "sentiment": "neutral",
+        "topics": ["error"],
+        "issues": [],
+        "praises": []
+    }
+
+def load_report_index(reports_dir: str = "reports") -> List[Dict]:
+    """
+    Load the index of generated reports, newest first.
+
+    The index is rebuilt from the reports' meta files when it is missing or when
+    reports were added or removed since it was written (e.g. by a git pull).
+    
+    Args:
+        reports_dir (str): Directory holding the reports (default: 'reports')
+        
+    Returns:
+        List[Dict]: One entry per app with its app_id, app_name and date
+    """
+    if not os.path.exists(reports_dir):
+        return []
+    index_path = os.path.join(reports_dir, REPORT_INDEX_FILE)
+    if os.path.exists(index_path) and os.stat(reports_dir).st_mtime_ns <= os.stat(index_path).st_mtime_ns:
+        return load_json(index_path)
+    
+    with os.scandir(reports_dir) as entries:
+        report_files = [e.name for e in entries if e.name.endswith('_report.json') and e.is_file()]
+    
+    index = []
+    for file in report_files:
+        app_id = file.replace('_report.json', '')
+        meta = load_report_meta(app_id, reports_dir)
+        index.append({
+            'app_id': app_id,
+            'app_name': meta['title'],
+            'date': meta['generated_at']
+        })
+    index.sort(key=lambda x: x['date'], reverse=True)
+    save_report_index(index, reports_dir)
+    return index
+
+def load_report_meta(app_id: str, reports_dir: str = "reports") -> Dict:
+    """
+    Load the title and generation date of a report from its meta file.
+
+    Reports without a meta file, or changed since it was written, get one
+    created from the full report.
+    
+    Args:
+        app_id (str): The Google Play Store app ID of the report
+        reports_dir (str): Directory holding the reports (default: 'reports')
+        
+    Returns:
+        Dict: The report's title and generated_at
+    """
+    meta_path = os.path.join(reports_dir, f"{app_id}{REPORT_META_SUFFIX}")
+    report_path = os.path.join(reports_dir, f"{app_id}_report.json")
+    if os.path.exists(meta_path) and os.stat(report_path).st_mtime_ns <= os.stat(meta_path).st_mtime_ns:
+        return load_json(meta_path)
+    report = load_json(report_path)
+    meta = {'title': report['app_info']['title'], 'generated_at': report['generated_at']}
+    dump_json(meta, meta_path)
+    return meta
+
+def save_report_index(index: List[Dict], reports_dir: str = "reports"):
+    """Write the index of generated reports."""
+    index_path = os.path.join(reports_dir, REPORT_INDEX_FILE)
+    dump_json(index, index_path)
+    # Moving the index into place touches the directory; date the index after
+    # that so it counts as up to date until reports are added or removed
+    os.utime(index_path)
+
+def update_report_index(entry: Dict, reports_dir: str = "reports"):
+    """Record a report in the index, replacing any older entry for the same app."""
+    index = [e for e in load_report_index(reports_dir) if e['app_id'] != entry['app_id']]
+    save_report_index([entry] + index, reports_dir)
 
 class PlayStoreReviewAnalyzer:
-    def __init__(self, app_id: str, lang: str = 'en', country: str = 'us'):
+    def __init__(self, app_id: str, lang: str = 'en', country: str = 'us',
+                 cache_dir: str = "reports", semantic_cache: bool = False,
+                 claude: Optional[anthropic.AsyncAnthropic] = None, encoder=None):
         """
         Initialize the analyzer with app details.
         
@@ -21,16 +320,57 @@ class PlayStoreReviewAnalyzer:
             app_id (str): The Google Play Store app ID
             lang (str): Language code for reviews (default: 'en')
             country (str): Country code for reviews (default: 'us')
+            cache_dir (str): Directory holding the sentiment cache (default: 'reports')
+            semantic_cache (bool): Also reuse analyses of near-duplicate reviews,
+                using sentence-transformers embeddings (default: False)
+            claude (AsyncAnthropic, optional): Claude client to use instead of
+                the shared one from get_claude()
+            encoder (SentenceTransformer, optional): Embedding model for the
+                semantic cache; loaded on first use with get_encoder() when omitted
         """
         self.app_id = app_id
         self.lang = lang
         self.country = country
         self.reviews = []  # Initialize reviews list
         self.app_info = None
+        self._analysis_cache = None
+        
+        # Shared Claude client
+        self.claude = claude if claude is not None else get_claude()
         
-        # Initialize Claude client
-        self.claude = anthropic.Client(api_key=os.getenv('ANTHROPIC_API_KEY'))
+        # Sentiment cache: exact matches on normalized review text, plus an
+        # optional embedding index over the same entries
+        self.cache_dir = cache_dir
+        self.semantic_cache = semantic_cache
+        self._exact_cache: Dict[str, Dict] = self._load_exact_cache()
+        self._new_cache_keys = set()
+        self._encoder = encoder
+        self._semantic_keys: List[str] = []
+        self._semantic_vectors: Optional[np.ndarray] = None
+        if semantic_cache:
+            self._load_semantic_cache()
         
+    @property
+    def reviews(self) -> List:
+        """Fetched reviews. Assigning new reviews discards the memoized analysis."""
+        return self._reviews
+
+    @reviews.setter
+    def reviews(self, value: List):
+        self._reviews = value
+        self._scores = np.fromiter((r['score'] for r in value), dtype=np.int8, count=len(value))
+        self._analysis_cache = None
+
+    @property
+    def scores(self) -> np.ndarray:
+        """Ratings of the fetched reviews, in review order, as an int8 array."""
+        return self._scores
+
+    def _rating_distribution(self) -> Dict[int, int]:
+        """Number of reviews per rating, in rating order, omitting ratings with no reviews."""
+        counts = np.bincount(self._scores, minlength=6)
+        return {rating: int(count) for rating, count in enumerate(counts) if count}
+
     def fetch_app_info(self) -> Dict:
         """Fetch basic app information from Play Store."""
         try:
@@ -39,33 +379,62 @@ class PlayStoreReviewAnalyzer:
         except Exception as e:
             raise Exception(f"Error fetching app info: {str(e)}")
     
-    def fetch_reviews(self, count: int = 100) -> List:
+    def fetch_reviews(self, count: int = 100, score_filter: Optional[Callable[[int], bool]] = None) -> List:
         """
         Fetch reviews from Play Store.
         
         Args:
             count (int): Number of reviews to fetch (default: 100)
+            score_filter (Callable, optional): Keep only reviews whose score passes
+                this predicate. Further pages are fetched until `count` reviews are
+                kept or MAX_REVIEW_PAGES pages have been read.
             
         Returns:
             List: List of reviews
         """
         try:
-            # Fetch reviews using google-play-scraper
-            reviews_result, _ = reviews(
-                self.app_id,
-                lang=self.lang,
-                country=self.country,
-                count=count,
-                sort=Sort.NEWEST  # Use the Sort enum from the library
-            )
+            reviews_result = []
+            token = None
+            for _ in range(MAX_REVIEW_PAGES):
+                # Fetch reviews using google-play-scraper
+                page, token = reviews(
+                    self.app_id,
+                    lang=self.lang,
+                    country=self.country,
+                    count=count,
+                    sort=Sort.NEWEST,  # Use the Sort enum from the library
+                    continuation_token=token
+                )
+                reviews_result.extend(r for r in page if score_filter is None or score_filter(r['score']))
+                if len(reviews_result) >= count or token.token is None:
+                    break
+            reviews_result = reviews_result[:count]
             self.reviews = reviews_result  # Store reviews in the instance variable
             return reviews_result
         except Exception as e:
             raise Exception(f"Error fetching reviews: {str(e)}")
+
+    def fetch_all(self, count: int = 100, score_filter: Optional[Callable[[int], bool]] = None) -> Tuple[Dict, List]:
+        """
+        Fetch app information and reviews concurrently.
+        
+        Args:
+            count (int): Number of reviews to fetch (default: 100)
+            score_filter (Callable, optional): Passed on to fetch_reviews()
+            
+        Returns:
+            Tuple: App information and list of reviews
+        """
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            app_info = executor.submit(self.fetch_app_info)
+            reviews_result = executor.submit(self.fetch_reviews, count, score_filter)
+            return app_info.result(), reviews_result.result()
     
     def analyze_sentiment(self, review_text: str) -> Dict:
         """
         Analyze sentiment and topics of a review using Claude API.
+
+        Shorthand for analyze_sentiment_batch() with a single review.
         
         Args:
             review_text (str): The review text to analyze
@@ -73,170 +442,412 @@ class PlayStoreReviewAnalyzer:
         Returns:
             Dict: Dictionary containing sentiment and topics
         """
-        prompt = f"""Analyze this app review and provide a JSON response with the following structure:
-{{
-    "sentiment": "positive/negative/neutral",
-    "topics": ["topic1", "topic2", ...],
-    "issues": ["issue1", "issue2", ...],
-    "praises": ["praise1", "praise2", ...]
-}}
-
-Review text: {review_text}
+        return self.analyze_sentiment_batch([review_text])[0]
 
-Respond ONLY with the JSON object, no other text."""
+    async def analyze_sentiment_async(self, review_text: str, semaphore: Optional[asyncio.Semaphore] = None) -> Dict:
+        """
+        Analyze sentiment and topics of a review using Claude API.
+        
+        Args:
+            review_text (str): The review text to analyze
+            semaphore (asyncio.Semaphore, optional): Bounds the Claude requests in flight
+            
+        Returns:
+            Dict: Dictionary containing sentiment and topics
+        """
+        key, embedding, cached = await self._cache_lookup(review_text)
+        if cached is not None:
+            return cached
 
         try:
-            response = self.claude.messages.create(
-                model="claude-3-7-sonnet-20250219",
+            response = await self._create_message(
+                semaphore,
+                model=CLAUDE_MODEL,
                 max_tokens=1000,
                 temperature=0,
+                tools=[RECORD_ANALYSIS_TOOL],
+                tool_choice={"type": "tool", "name": RECORD_ANALYSIS_TOOL["name"]},
+                system=[
+                    {
+                        "type": "text",
+                        "text": STATIC_INSTRUCTIONS,
+                        "cache_control": {"type": "ephemeral"}
+                    }
+                ],
                 messages=[
                     {
                         "role": "user",
-                        "content": prompt
+                        "content": f"Review text: {review_text}"
                     }
                 ]
             )
             
-            # Get the response text and clean it
-            response_text = response.content[0].text.strip()
+            analysis = _validate_analysis(_response_payload(response))
             
-            # Try to find JSON in the response
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
+            self._remember(key, analysis, embedding)
+            return analysis
             
-            if start_idx == -1 or end_idx == 0:
-                raise ValueError("No JSON object found in response")
-                
-            json_str = response_text[start_idx:end_idx]
+        except Exception as e:
+            print(f"Error analyzing sentiment: {str(e)}")
+            print(f"Response: {response.content if 'response' in locals() else 'No response'}")
+            return _fallback_analysis()
+
+    def analyze_sentiment_batch(self, texts: List[str]) -> List[Dict]:
+        """
+        Analyze sentiment and topics of many reviews, BATCH_SIZE per Claude request.
+
+        Synchronous wrapper around analyze_sentiment_batch_async().
+        
+        Args:
+            texts (List[str]): The review texts to analyze
             
-            # Parse the JSON
-            analysis = json.loads(json_str)
+        Returns:
+            List[Dict]: One analysis per text, in the same order
+        """
+        analyses = _run(self.analyze_sentiment_batch_async(texts))
+        self.save_cache()
+        return analyses
+
+    async def _analyze_batch_async(self, texts: List[str],
+                                   semaphore: Optional[asyncio.Semaphore] = None) -> List[Dict]:
+        """
+        Analyze sentiment and topics of up to BATCH_SIZE reviews with a single Claude request.
+
+        Cached reviews are not sent. If the response does not contain exactly one
+        valid analysis per review, the remaining reviews are analyzed one by one.
+        
+        Args:
+            texts (List[str]): The review texts to analyze
+            semaphore (asyncio.Semaphore, optional): Bounds the Claude requests in
+                flight, including those of the one-by-one fallback
             
-            # Validate the response structure
-            required_keys = ["sentiment", "topics", "issues", "praises"]
-            if not all(key in analysis for key in required_keys):
-                raise ValueError("Response missing required keys")
-                
-            # Validate sentiment value
-            if analysis["sentiment"] not in ["positive", "negative", "neutral", "mixed"]:
-                raise ValueError(f"Invalid sentiment value: {analysis['sentiment']}")
+        Returns:
+            List[Dict]: One analysis per text, in the same order
+        """
+        lookups = [await self._cache_lookup(text) for text in texts]
+        analyses = [cached for _, _, cached in lookups]
+        pending = [i for i, analysis in enumerate(analyses) if analysis is None]
+        if len(pending) <= 1:
+            for i in pending:
+                analyses[i] = await self.analyze_sentiment_async(texts[i], semaphore)
+            return analyses
+
+        # A JSON array keeps reviews apart even when they contain newlines or numbering
+        reviews_text = json.dumps([texts[i] for i in pending], ensure_ascii=False)
+        try:
+            response = await self._create_message(
+                semaphore,
+                model=CLAUDE_MODEL,
+                max_tokens=min(BATCH_TOKENS_PER_REVIEW * len(pending), MAX_OUTPUT_TOKENS),
+                temperature=0,
+                tools=[RECORD_ANALYSES_TOOL],
+                tool_choice={"type": "tool", "name": RECORD_ANALYSES_TOOL["name"]},
+                system=[
+                    {
+                        "type": "text",
+                        "text": BATCH_INSTRUCTIONS,
+                        "cache_control": {"type": "ephemeral"}
+                    }
+                ],
+                messages=[
+                    {
+                        "role": "user",
+                        "content": f"Reviews:\n{reviews_text}"
+                    }
+                ]
+            )
             
-            # Convert mixed sentiment to neutral
-            if analysis["sentiment"] == "mixed":
-                analysis["sentiment"] = "neutral"
+            results = _response_payload(response)["results"]
+            if len(results) != len(pending):
+                raise ValueError(f"Expected {len(pending)} results, got {len(results)}")
             
-            return analysis
+            for i, result in zip(pending, results):
+                analysis = _validate_analysis(result)
+                key, embedding, _ = lookups[i]
+                self._remember(key, analysis, embedding)
+                analyses[i] = analysis
             
         except Exception as e:
-            print(f"Error analyzing sentiment: {str(e)}")
-            print(f"Response text: {response_text if 'response_text' in locals() else 'No response'}")
-            return {
-                "sentiment": "neutral",
-                "topics": ["error"],
-                "issues": [],
-                "praises": []
-            }
+            print(f"Error analyzing review batch, analyzing reviews individually: {str(e)}")
+            fallback = await asyncio.gather(*(self.analyze_sentiment_async(texts[i], semaphore) for i in pending))
+            for i, analysis in zip(pending, fallback):
+                analyses[i] = analysis
+        
+        return analyses
+
+    async def _create_message(self, semaphore: Optional[asyncio.Semaphore], **kwargs):
+        """
+        Send a request to Claude, holding a slot of semaphore while it is in flight.
+
+        The timeout grows with max_tokens, so large batches aren't cut off
+        while Claude is still writing their results.
+        """
+        kwargs['timeout'] = REQUEST_TIMEOUT + kwargs['max_tokens'] / OUTPUT_TOKENS_PER_SECOND
+        if semaphore is None:
+            return await self.claude.messages.create(**kwargs)
+        async with semaphore:
+            return await self.claude.messages.create(**kwargs)
+
+    @staticmethod
+    def _cache_key(review_text: str) -> str:
+        """
+        Hash of the normalized review text and SENTIMENT_CACHE_VERSION, used as
+        the exact-match cache key.
+        """
+        normalized = (review_text or "").strip().lower()
+        return hashlib.blake2b(f"{SENTIMENT_CACHE_VERSION}\0{normalized}".encode('utf-8'), digest_size=16).hexdigest()
+
+    async def _cache_lookup(self, review_text: str) -> Tuple[str, Optional[np.ndarray], Optional[Dict]]:
+        """
+        Look up a review in the sentiment cache.
+        
+        Returns:
+            Tuple: Cache key, embedding (only with semantic_cache) and a copy of
+            the cached analysis, or None on a miss
+        """
+        key = self._cache_key(review_text)
+        if key in self._exact_cache:
+            return key, None, copy.deepcopy(self._exact_cache[key])
+
+        embedding = None
+        cached = None
+        if self.semantic_cache:
+            embedding = await asyncio.to_thread(self._embed, review_text)
+            cached = self._semantic_lookup(embedding)
+        return key, embedding, copy.deepcopy(cached)
+
+    def _exact_cache_path(self) -> str:
+        return os.path.join(self.cache_dir, "sentiment_cache.json")
+
+    def _semantic_cache_path(self) -> str:
+        return os.path.join(self.cache_dir, "sentiment_cache_embeddings.npz")
+
+    def _load_exact_cache(self) -> Dict[str, Dict]:
+        """Load previously cached analyses from disk, if any."""
+        path = self._exact_cache_path()
+        try:
+            stat = os.stat(path)
+            return dict(_read_cache_file(path, stat.st_ino, stat.st_mtime_ns))
+        except (OSError, ValueError):
+            return {}
+
+    def _read_semantic_cache(self) -> Tuple[List[str], Optional[np.ndarray]]:
+        """Read the stored embedding keys and vectors, if any."""
+        path = self._semantic_cache_path()
+        if not os.path.exists(path):
+            return [], None
+        with np.load(path) as data:
+            return [str(k) for k in data['keys']], data['vectors']
+
+    def _load_semantic_cache(self):
+        """Load stored embeddings, keeping only those whose analysis is still cached."""
+        keys, vectors = self._read_semantic_cache()
+        keep = [i for i, k in enumerate(keys) if k in self._exact_cache]
+        if keep:
+            self._semantic_keys = [keys[i] for i in keep]
+            self._semantic_vectors = vectors[keep]
+
+    def _embed(self, review_text: str) -> np.ndarray:
+        """Compute a unit-length embedding of the review text."""
+        if self._encoder is None:
+            self._encoder = get_encoder()
+        return self._encoder.encode(review_text or "", normalize_embeddings=True)
+
+    def _semantic_lookup(self, embedding: np.ndarray) -> Optional[Dict]:
+        """Return the cached analysis of the most similar review, if similar enough."""
+        if self._semantic_vectors is None:
+            return None
+        similarities = self._semantic_vectors @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] >= SEMANTIC_CACHE_THRESHOLD:
+            return self._exact_cache[self._semantic_keys[best]]
+        return None
+
+    def _remember(self, key: str, analysis: Dict, embedding: Optional[np.ndarray] = None):
+        """Add a successful analysis to the cache."""
+        self._exact_cache[key] = copy.deepcopy(analysis)
+        self._new_cache_keys.add(key)
+        if embedding is not None:
+            self._semantic_keys.append(key)
+            if self._semantic_vectors is None:
+                self._semantic_vectors = embedding[np.newaxis, :]
+            else:
+                self._semantic_vectors = np.vstack([self._semantic_vectors, embedding])
+
+    def save_cache(self):
+        """
+        Persist analyses added since the last save to cache_dir.
+
+        New entries and their embeddings are merged into the cache as currently
+        stored, so analyzers saving concurrently don't drop each other's entries.
+        """
+        if not self._new_cache_keys:
+            return
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        cache = self._load_exact_cache()
+        cache.update((key, self._exact_cache[key]) for key in self._new_cache_keys)
+        dump_json(cache, self._exact_cache_path(), indent=False)
+        self._exact_cache = cache
+        self._new_cache_keys = set()
+        if self._semantic_vectors is not None:
+            keys, vectors = self._read_semantic_cache()
+            known = set(self._semantic_keys)
+            stored = [i for i, k in enumerate(keys) if k not in known and k in cache]
+            if stored:
+                self._semantic_keys = self._semantic_keys + [keys[i] for i in stored]
+                self._semantic_vectors = np.vstack([self._semantic_vectors, vectors[stored]])
+            with _atomic_open(self._semantic_cache_path(), 'wb') as f:
+                np.savez(f, keys=np.array(self._semantic_keys), vectors=self._semantic_vectors)
+
+    async def analyze_sentiment_batch_async(self, texts: List[str]) -> List[Dict]:
+        """
+        Analyze sentiment and topics of many reviews in batches of BATCH_SIZE,
+        with at most MAX_CONCURRENT_REQUESTS Claude requests in flight at a time.
+        
+        Args:
+            texts (List[str]): Review texts to analyze
+            
+        Returns:
+            List[Dict]: One analysis per text, in the same order
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        texts_iter = iter(texts)
+        batches = list(iter(lambda: list(islice(texts_iter, BATCH_SIZE)), []))
+
+        results = await asyncio.gather(*(self._analyze_batch_async(batch, semaphore) for batch in batches),
+                                       return_exceptions=True)
+        analyses = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, BaseException):
+                result = [_fallback_analysis() for _ in batch]
+            analyses.extend(result)
+        return analyses
     
     def analyze_reviews(self) -> Dict:
         """
         Analyze all reviews and generate insights.
+
+        The result is memoized until the reviews change.
         
         Returns:
             Dict: Dictionary containing analysis results
         """
         if not self.reviews:
             raise ValueError("Please fetch reviews first using fetch_reviews()")
-            
-        # Convert reviews to DataFrame for easier analysis
-        reviews_df = pd.DataFrame(self.reviews)
-            
-        # Basic statistics
-        stats = {
-            "total_reviews": len(reviews_df),
-            "average_rating": reviews_df['score'].mean(),
-            "rating_distribution": reviews_df['score'].value_counts().to_dict(),
-            "sentiment_distribution": {"positive": 0, "neutral": 0, "negative": 0},
-            "common_topics": {},
-            "common_issues": {},
-            "common_praises": {}
-        }
+        if self._analysis_cache is None:
+            self._analysis_cache = self._compute_analysis()
+        return self._analysis_cache
+
+    def _compute_analysis(self) -> Dict:
+        """Run the Claude analysis over all reviews and aggregate the results."""
+        # Analyze each distinct review text once, concurrently
+        content_counts = Counter((r['content'] or '').strip() for r in self.reviews)
+        texts = list(content_counts)
+        analyses = _run(self.analyze_sentiment_batch_async(texts))
+        self.save_cache()
         
-        # Analyze each review
-        for _, review in reviews_df.iterrows():
-            analysis = self.analyze_sentiment(review['content'])
-            stats["sentiment_distribution"][analysis["sentiment"]] += 1
-            
-            # Count topics
-            for topic in analysis["topics"]:
-                stats["common_topics"][topic] = stats["common_topics"].get(topic, 0) + 1
-                
-            # Count issues
-            for issue in analysis["issues"]:
-                stats["common_issues"][issue] = stats["common_issues"].get(issue, 0) + 1
-                
-            # Count praises
-            for praise in analysis["praises"]:
-                stats["common_praises"][praise] = stats["common_praises"].get(praise, 0) + 1
+        # Count sentiments, topics, issues and praises in a single pass,
+        # weighting each analysis by how many reviews share its text
+        sentiments, topics, issues, praises = Counter(), Counter(), Counter(), Counter()
+        for text, analysis in zip(texts, analyses):
+            weight = content_counts[text]
+            sentiments[analysis["sentiment"]] += weight
+            for counter, items in ((topics, analysis["topics"]),
+                                   (issues, analysis["issues"]),
+                                   (praises, analysis["praises"])):
+                for item in items:
+                    counter[item] += weight
         
-        # Sort dictionaries by frequency
-        stats["common_topics"] = dict(sorted(stats["common_topics"].items(), key=lambda x: x[1], reverse=True))
-        stats["common_issues"] = dict(sorted(stats["common_issues"].items(), key=lambda x: x[1], reverse=True))
-        stats["common_praises"] = dict(sorted(stats["common_praises"].items(), key=lambda x: x[1], reverse=True))
+        # Basic statistics, with topic, issue and praise counts sorted by frequency
+        stats = {
+            "total_reviews": len(self.reviews),
+            "average_rating": float(self._scores.mean()),
+            "rating_distribution": self._rating_distribution(),
+            "sentiment_distribution": {s: sentiments[s] for s in ("positive", "neutral", "negative")},
+            "common_topics": dict(topics.most_common()),
+            "common_issues": dict(issues.most_common()),
+            "common_praises": dict(praises.most_common())
+        }
         
         return stats
     
-    def visualize_sentiment(self, save_path: str = None):
+    def visualize_sentiment(self, save_path=None, analysis: Dict = None) -> go.Figure:
         """
         Create visualization of sentiment distribution.
         
         Args:
-            save_path (str, optional): Path to save the plot
+            save_path (str or file-like, optional): Path or binary stream to save
+                the plot to as a PNG; the plot is shown instead when omitted
+            analysis (Dict, optional): Precomputed result of analyze_reviews()
+            
+        Returns:
+            go.Figure: The rating and sentiment distribution plots
         """
         if not self.reviews:
             raise ValueError("Please fetch reviews first using fetch_reviews()")
-            
-        # Convert reviews to DataFrame for visualization
-        reviews_df = pd.DataFrame(self.reviews)
+        if analysis is None:
+            analysis = self.analyze_reviews()
             
         # Create a figure with two subplots
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+        fig = make_subplots(
+            rows=1,
+            cols=2,
+            subplot_titles=(f"Rating Distribution for {self.app_info['title']}", "Sentiment Distribution")
+        )
         
         # Plot 1: Rating Distribution
-        sns.countplot(data=reviews_df, y='score', ax=ax1)
-        ax1.set_title(f"Rating Distribution for {self.app_info['title']}")
-        ax1.set_xlabel("Count")
-        ax1.set_ylabel("Rating")
+        rating_distribution = self._rating_distribution()
+        fig.add_trace(go.Bar(
+            x=list(rating_distribution.values()),
+            y=[str(rating) for rating in rating_distribution],
+            orientation='h'
+        ), row=1, col=1)
+        fig.update_xaxes(title_text="Count", row=1, col=1)
+        fig.update_yaxes(title_text="Rating", row=1, col=1)
         
         # Plot 2: Sentiment Distribution
-        sentiment_data = pd.DataFrame({
-            'Sentiment': list(self.analyze_reviews()['sentiment_distribution'].keys()),
-            'Count': list(self.analyze_reviews()['sentiment_distribution'].values())
-        })
-        sns.barplot(data=sentiment_data, x='Count', y='Sentiment', ax=ax2)
-        ax2.set_title("Sentiment Distribution")
-        ax2.set_xlabel("Count")
+        sentiment_distribution = analysis['sentiment_distribution']
+        fig.add_trace(go.Bar(
+            x=list(sentiment_distribution.values()),
+            y=list(sentiment_distribution.keys()),
+            orientation='h'
+        ), row=1, col=2)
+        fig.update_xaxes(title_text="Count", row=1, col=2)
         
-        plt.tight_layout()
+        fig.update_layout(width=1500, height=600, showlegend=False)
         
-        if save_path:
-            plt.savefig(save_path)
-        plt.show()
+        if isinstance(save_path, str):
+            fig.write_image(save_path)
+        elif save_path is not None:
+            fig.write_image(save_path, format='png')
+        else:
+            fig.show()
+        return fig
     
-    def generate_report(self, output_dir: str = "reports"):
+    def generate_report(self, output_dir: str = "reports", report_stream=None, viz_stream=None) -> Optional[str]:
         """
         Generate a comprehensive report of the analysis.
         
         Args:
             output_dir (str): Directory to save the report
+            report_stream (file-like, optional): Text stream to write the report JSON
+                to instead of output_dir; the report index is left untouched
+            viz_stream (file-like, optional): Binary stream to write the PNG
+                visualization to instead of output_dir
+            
+        Returns:
+            Optional[str]: Path of the saved report, or None when it was streamed
         """
-        if not os.path.exists(output_dir):
+        if (report_stream is None or viz_stream is None) and not os.path.exists(output_dir):
             os.makedirs(output_dir)
             
         # Fetch data if not already done
-        if self.app_info is None:
+        if self.app_info is None and not self.reviews:
+            self.fetch_all()
+        elif self.app_info is None:
             self.fetch_app_info()
-        if not self.reviews:
+        elif not self.reviews:
             self.fetch_reviews()
             
         # Generate analysis
@@ -268,12 +879,30 @@ Respond ONLY with the JSON object, no other text."""
         }
         
         # Save report
-        report_path = os.path.join(output_dir, f"{self.app_id}_report.json")
-        with open(report_path, 'w') as f:
-            json.dump(report, f, indent=2)
+        report_path = None
+        if report_stream is not None:
+            json.dump(report, report_stream, indent=2)
+        else:
+            report_path = os.path.join(output_dir, f"{self.app_id}_report.json")
+            dump_json(report, report_path)
+            dump_json({
+                'title': report['app_info']['title'],
+                'generated_at': report['generated_at']
+            }, os.path.join(output_dir, f"{self.app_id}{REPORT_META_SUFFIX}"))
+            update_report_index({
+                'app_id': self.app_id,
+                'app_name': report['app_info']['title'],
+                'date': report['generated_at']
+            }, output_dir)
             
-        # Generate visualization
-        self.visualize_sentiment(os.path.join(output_dir, f"{self.app_id}_sentiment.png"))
+        # Generate visualization. Exporting it needs Chrome for Kaleido; the
+        # report is complete without it, so a failed export is only logged
+        if viz_stream is None:
+            viz_stream = os.path.join(output_dir, f"{self.app_id}_sentiment.png")
+        try:
+            self.visualize_sentiment(viz_stream, analysis=analysis)
+        except Exception as e:
+            print(f"Error exporting visualization: {str(e)}")
         
         return report_path
 
@@ -283,8 +912,7 @@ def main():
     analyzer = PlayStoreReviewAnalyzer(app_id)
     
     # Fetch data
-    analyzer.fetch_app_info()
-    analyzer.fetch_reviews(count=100)
+    analyzer.fetch_all(count=100)
     
     # Generate report
     report_path = analyzer.generate_report()
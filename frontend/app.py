@@ -1,13 +1,17 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import json
 import os
-from datetime import datetime
+import functools
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from app_review_analyzer import PlayStoreReviewAnalyzer
+from app_review_analyzer import (
+    PlayStoreReviewAnalyzer,
+    REPORT_INDEX_FILE,
+    REPORT_META_SUFFIX,
+    load_json,
+    load_report_index,
+)
 
 # Set page config
 st.set_page_config(
@@ -52,46 +56,66 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# Selectable review languages and countries
+LANGUAGES = (
+    "en", "es", "fr", "de", "ja", "ko", "ru", "zh", "hi", "ar",
+    "pt", "it", "nl", "pl", "tr", "vi", "th", "id", "ms", "fil",
+    "uk", "cs", "el", "he", "ro", "hu", "da", "sv", "fi", "no",
+    "sk", "hr", "ca", "bg", "sr", "et", "lv", "lt", "sl", "is",
+    "fa", "bn", "ur", "sw", "am", "ne", "si", "km", "my", "ka",
+    "hy", "az", "eu", "be", "bs", "cy", "gl", "ka", "lb", "mk",
+    "ml", "mr", "mn", "mt", "nb", "or", "ps", "pa", "qu", "rm",
+    "rw", "sa", "sd", "sn", "so", "sq", "sr", "st", "su", "sw",
+    "ta", "te", "tg", "ti", "tk", "tl", "tn", "to", "ts", "tt",
+    "ug", "uk", "ur", "uz", "ve", "vi", "vo", "wa", "wo", "xh",
+    "yi", "yo", "zu"
+)
+
+COUNTRIES = (
+    "us", "gb", "ca", "au", "jp", "in", "de", "fr", "br", "ru",
+    "es", "it", "kr", "cn", "mx", "sg", "ae", "sa", "za", "nl",
+    "se", "ch", "no", "dk", "fi", "ie", "be", "at", "pl", "cz",
+    "hu", "gr", "il", "ro", "sk", "ua", "cl", "ar", "co", "pe",
+    "ve", "my", "ph", "id", "th", "vn", "tr", "eg", "pk", "bd",
+    "lk", "np", "kh", "la", "mm", "bn", "kz", "uz", "az", "ge",
+    "am", "kg", "tj", "tm", "af", "iq", "sy", "lb", "jo", "kw",
+    "bh", "om", "qa", "ye", "et", "ke", "ng", "gh", "ma", "dz",
+    "tn", "ly", "sd", "sn", "ci", "cm", "ug", "zm", "zw", "mw",
+    "ao", "mz", "na", "bw", "ls", "sz", "km", "mg", "mu", "sc",
+    "cv", "gm", "gw", "lr", "sl", "st", "ne", "bf", "ml", "mr",
+    "td", "cf", "gq", "cg", "cd", "bi", "rw", "dj", "er", "so",
+    "ss", "tz"
+)
+
+# Reports (and the charts built from them) kept in memory, about one per app;
+# entries for older versions of regenerated reports are evicted first
+MAX_CACHED_REPORTS = 50
+
 def load_report(app_id: str) -> dict:
     """Load the analysis report from JSON file."""
     report_path = f"reports/{app_id}_report.json"
     if os.path.exists(report_path):
-        with open(report_path, 'r') as f:
-            return json.load(f)
+        return _load_report_file(report_path, os.path.getmtime(report_path))
     return None
 
-def get_analysis_history():
-    """Get list of previously analyzed apps."""
-    reports_dir = "reports"
-    if not os.path.exists(reports_dir):
-        return []
-    
-    history = []
-    for file in os.listdir(reports_dir):
-        if file.endswith('_report.json'):
-            with open(os.path.join(reports_dir, file), 'r') as f:
-                report = json.load(f)
-                history.append({
-                    'app_id': file.replace('_report.json', ''),
-                    'app_name': report['app_info']['title'],
-                    'date': report['generated_at']
-                })
-    return sorted(history, key=lambda x: x['date'], reverse=True)
+@st.cache_data(show_spinner=False, max_entries=MAX_CACHED_REPORTS)
+def _load_report_file(report_path: str, mtime: float) -> dict:
+    """Parse a report file. mtime is only part of the cache key, so rewritten reports are reloaded."""
+    return load_json(report_path)
 
-def save_history(history):
-    """Save analysis history to a JSON file."""
-    history_file = "reports/analysis_history.json"
-    with open(history_file, 'w') as f:
-        json.dump(history, f, indent=2)
+@st.cache_data(ttl=60)
+def get_analysis_history():
+    """Get list of previously analyzed apps from the report index."""
+    return load_report_index("reports")
 
-def create_rating_distribution_plot(reviews_df: pd.DataFrame) -> go.Figure:
+@st.cache_data(show_spinner=False, max_entries=MAX_CACHED_REPORTS)
+def create_rating_distribution_plot(rating_data: dict) -> go.Figure:
     """Create a rating distribution plot using Plotly."""
-    fig = px.histogram(
-        reviews_df,
-        x='score',
+    fig = px.bar(
+        x=list(rating_data.keys()),
+        y=list(rating_data.values()),
         title='Rating Distribution',
-        nbins=5,
-        labels={'score': 'Rating', 'count': 'Number of Reviews'}
+        labels={'x': 'Rating', 'y': 'Number of Reviews'}
     )
     fig.update_layout(
         xaxis_title="Rating",
@@ -100,6 +124,7 @@ def create_rating_distribution_plot(reviews_df: pd.DataFrame) -> go.Figure:
     )
     return fig
 
+@st.cache_data(show_spinner=False, max_entries=MAX_CACHED_REPORTS)
 def create_sentiment_distribution_plot(sentiment_data: dict) -> go.Figure:
     """Create a sentiment distribution plot using Plotly."""
     fig = px.pie(
@@ -109,23 +134,21 @@ def create_sentiment_distribution_plot(sentiment_data: dict) -> go.Figure:
     )
     return fig
 
+@st.cache_data(show_spinner=False, max_entries=MAX_CACHED_REPORTS)
 def create_topics_plot(topics_data: dict, title: str) -> go.Figure:
     """Create a horizontal bar plot for topics/issues/praises."""
-    df = pd.DataFrame({
-        'Item': list(topics_data.keys()),
-        'Count': list(topics_data.values())
-    }).sort_values('Count', ascending=True)
-    
+    # Reports store counts already sorted by frequency, and the axis category
+    # order puts the largest bar on top, so no re-sorting is needed here
     fig = px.bar(
-        df,
-        x='Count',
-        y='Item',
+        x=list(topics_data.values()),
+        y=list(topics_data.keys()),
         title=title,
-        orientation='h'
+        orientation='h',
+        labels={'x': 'Count', 'y': 'Item'}
     )
     fig.update_layout(
         yaxis={'categoryorder': 'total ascending'},
-        height=max(400, len(df) * 25)
+        height=max(400, len(topics_data) * 25)
     )
     return fig
 
@@ -142,40 +165,29 @@ def display_review_card(review: dict, sentiment: str):
         </div>
     """, unsafe_allow_html=True)
 
+# Maps A-Z to the matching regional indicator symbols
+_FLAG_TRANS = str.maketrans({chr(c): chr(c + 127397) for c in range(ord('A'), ord('Z') + 1)})
+
+@functools.lru_cache(maxsize=256)
 def get_country_flag(country_code: str) -> str:
     """Convert country code to flag emoji."""
-    # Convert country code to uppercase
-    code = country_code.upper()
-    # Convert country code to regional indicator symbols
-    flag = ''.join([chr(ord(c) + 127397) for c in code])
-    return flag
+    return country_code.upper().translate(_FLAG_TRANS)
+
+_COUNTRY_OPTIONS = {f"{get_country_flag(code)} {code.upper()}": code for code in COUNTRIES}
 
 def get_country_options():
     """Get list of country options with flags."""
-    countries = [
-        "us", "gb", "ca", "au", "jp", "in", "de", "fr", "br", "ru",
-        "es", "it", "kr", "cn", "mx", "sg", "ae", "sa", "za", "nl",
-        "se", "ch", "no", "dk", "fi", "ie", "be", "at", "pl", "cz",
-        "hu", "gr", "il", "ro", "sk", "ua", "cl", "ar", "co", "pe",
-        "ve", "my", "ph", "id", "th", "vn", "tr", "eg", "pk", "bd",
-        "lk", "np", "kh", "la", "mm", "bn", "kz", "uz", "az", "ge",
-        "am", "kg", "tj", "tm", "af", "iq", "sy", "lb", "jo", "kw",
-        "bh", "om", "qa", "ye", "et", "ke", "ng", "gh", "ma", "dz",
-        "tn", "ly", "sd", "sn", "ci", "cm", "ug", "zm", "zw", "mw",
-        "ao", "mz", "na", "bw", "ls", "sz", "km", "mg", "mu", "sc",
-        "cv", "gm", "gw", "lr", "sl", "st", "ne", "bf", "ml", "mr",
-        "td", "cf", "gq", "cg", "cd", "bi", "rw", "dj", "er", "so",
-        "ss", "tz"
-    ]
-    return {f"{get_country_flag(code)} {code.upper()}": code for code in countries}
+    return _COUNTRY_OPTIONS
 
 def clear_history():
     """Clear all analysis history by removing report files."""
     reports_dir = "reports"
     if os.path.exists(reports_dir):
-        for file in os.listdir(reports_dir):
-            if file.endswith('_report.json'):
-                os.remove(os.path.join(reports_dir, file))
+        with os.scandir(reports_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(('_report.json', REPORT_META_SUFFIX)) or entry.name == REPORT_INDEX_FILE:
+                    os.remove(entry.path)
+        get_analysis_history.clear()
         st.success("History cleared successfully!")
 
 def display_analysis_results(report):
@@ -198,24 +210,7 @@ def display_analysis_results(report):
     # Rating and Sentiment Distribution
     col1, col2 = st.columns(2)
     with col1:
-        # Create rating distribution data from the report
-        rating_dist = report['analysis']['rating_distribution']
-        rating_df = pd.DataFrame({
-            'Rating': list(rating_dist.keys()),
-            'Count': list(rating_dist.values())
-        })
-        fig1 = px.bar(
-            rating_df,
-            x='Rating',
-            y='Count',
-            title='Rating Distribution',
-            labels={'Rating': 'Rating', 'Count': 'Number of Reviews'}
-        )
-        fig1.update_layout(
-            xaxis_title="Rating",
-            yaxis_title="Number of Reviews",
-            showlegend=False
-        )
+        fig1 = create_rating_distribution_plot(report['analysis']['rating_distribution'])
         st.plotly_chart(fig1, use_container_width=True, key="rating_distribution")
     
     with col2:
@@ -291,19 +286,7 @@ def main():
     # Language and country selection
     col1, col2 = st.sidebar.columns(2)
     with col1:
-        lang = st.selectbox("Language", [
-            "en", "es", "fr", "de", "ja", "ko", "ru", "zh", "hi", "ar",
-            "pt", "it", "nl", "pl", "tr", "vi", "th", "id", "ms", "fil",
-            "uk", "cs", "el", "he", "ro", "hu", "da", "sv", "fi", "no",
-            "sk", "hr", "ca", "bg", "sr", "et", "lv", "lt", "sl", "is",
-            "fa", "bn", "ur", "sw", "am", "ne", "si", "km", "my", "ka",
-            "hy", "az", "eu", "be", "bs", "cy", "gl", "ka", "lb", "mk",
-            "ml", "mr", "mn", "mt", "nb", "or", "ps", "pa", "qu", "rm",
-            "rw", "sa", "sd", "sn", "so", "sq", "sr", "st", "su", "sw",
-            "ta", "te", "tg", "ti", "tk", "tl", "tn", "to", "ts", "tt",
-            "ug", "uk", "ur", "uz", "ve", "vi", "vo", "wa", "wo", "xh",
-            "yi", "yo", "zu"
-        ])
+        lang = st.selectbox("Language", LANGUAGES)
     with col2:
         country_options = get_country_options()
         selected_country = st.selectbox(
@@ -320,29 +303,18 @@ def main():
             with st.spinner("Analyzing reviews..."):
                 analyzer = PlayStoreReviewAnalyzer(app_id, lang, country)
                 
-                # Fetch app info
-                analyzer.fetch_app_info()
-                
-                # Fetch reviews based on analysis type
+                # Fetch app info and reviews based on analysis type
                 if analysis_type == "Negative Reviews Only":
-                    analyzer.fetch_reviews(count=review_count * 2)  # Fetch more to ensure enough negative reviews
-                    analyzer.reviews = [r for r in analyzer.reviews if r.get('score', 0) <= 3]
+                    analyzer.fetch_all(count=review_count, score_filter=lambda score: score <= 3)
                 else:
-                    analyzer.fetch_reviews(count=review_count)
+                    analyzer.fetch_all(count=review_count)
                 
                 # Generate report
                 report_path = analyzer.generate_report()
                 st.success(f"Analysis complete! Report saved to {report_path}")
                 
-                # Save to history
-                history = get_analysis_history()
-                history.append({
-                    'app_id': app_id,
-                    'app_name': analyzer.app_info['title'],
-                    'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'report_path': report_path
-                })
-                save_history(history)
+                # generate_report() already recorded the report in the index
+                get_analysis_history.clear()
                 
                 # Reload the page to show the new report
                 st.rerun()
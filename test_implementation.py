@@ -1,161 +1,596 @@
+"""
+Tests for PlayStoreReviewAnalyzer.
+
+The test dependencies are listed in requirements-dev.txt. Independent tests
+can run in parallel with pytest-xdist:
+
+    pytest -n auto test_implementation.py
+
+The Play Store and Claude are replaced with the fakes below, so the tests run
+offline and deterministically. Tests marked network talk to the live services
+and are skipped by default; run them nightly with:
+
+    pytest -m network test_implementation.py
+
+Every other test must finish within 5 seconds, so a test that regresses to
+live network calls fails instead of hanging. On POSIX the limit is enforced
+with SIGALRM and only the slow test fails. Platforms without SIGALRM
+(Windows) fall back to pytest-timeout's thread method, which ends the whole
+pytest process at the first slow test; under xdist, add
+--max-worker-restart=0 there so that ends the run instead of replacing the
+worker.
+"""
+import io
 import os
-import unittest
-from app_review_analyzer import PlayStoreReviewAnalyzer
+import json
+import signal
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Annotated, Dict, List, Literal, Optional
+from unittest.mock import patch
+import msgspec
+import numpy as np
+import pytest
+from app_review_analyzer import (BATCH_SIZE, MAX_CONCURRENT_REQUESTS, REQUEST_TIMEOUT, PlayStoreReviewAnalyzer,
+                                 load_report_index, update_report_index)
 from dotenv import load_dotenv
+from google_play_scraper.exceptions import NotFoundError
+
+APP_ID = "com.nianticlabs.pokemongo"  # Using Pokémon GO as test app
+
+pytestmark = pytest.mark.timeout(5, method="signal" if hasattr(signal, "SIGALRM") else "thread")
+
+# Different types of reviews for sentiment analysis
+SENTIMENT_TEST_REVIEWS = [
+    "This app is amazing! I love it!",
+    "Terrible app, crashes all the time.",
+    "It's okay, could be better.",
+    "Mixed feelings about this one."
+]
+
+
+# Expected shapes of analyzer results; extra keys are ignored
+class AppInfo(msgspec.Struct):
+    title: str
+    developer: str
+    score: float
+    reviews: int
+
+
+class Review(msgspec.Struct):
+    content: Optional[str]
+    score: Annotated[int, msgspec.Meta(ge=1, le=5)]
+    userName: str
+
+
+class SentimentAnalysis(msgspec.Struct):
+    sentiment: Literal['positive', 'negative', 'neutral']
+    topics: List[str]
+    issues: List[str]
+    praises: List[str]
+
+
+class AnalysisReport(msgspec.Struct):
+    total_reviews: int
+    average_rating: float
+    rating_distribution: Dict[int, int]
+    sentiment_distribution: Dict[str, int]
+    common_topics: Dict[str, int]
+    common_issues: Dict[str, int]
+    common_praises: Dict[str, int]
 
-# Load environment variables
-load_dotenv()
-
-class TestPlayStoreReviewAnalyzer(unittest.TestCase):
-    def setUp(self):
-        """Set up test cases."""
-        self.app_id = "com.nianticlabs.pokemongo"  # Using Pokémon GO as test app
-        self.analyzer = PlayStoreReviewAnalyzer(self.app_id)
-        
-    def test_initialization(self):
-        """Test if the analyzer is properly initialized."""
-        self.assertEqual(self.analyzer.app_id, self.app_id)
-        self.assertEqual(self.analyzer.lang, 'en')
-        self.assertEqual(self.analyzer.country, 'us')
-        self.assertEqual(self.analyzer.reviews, [])
-        self.assertIsNone(self.analyzer.app_info)
-        
-    def test_fetch_app_info(self):
-        """Test app info fetching."""
-        app_info = self.analyzer.fetch_app_info()
-        
-        # Check if required fields are present
-        self.assertIsNotNone(app_info)
-        self.assertIn('title', app_info)
-        self.assertIn('developer', app_info)
-        self.assertIn('score', app_info)
-        self.assertIn('reviews', app_info)
-        
-        # Check if values are of correct type
-        self.assertIsInstance(app_info['title'], str)
-        self.assertIsInstance(app_info['developer'], str)
-        self.assertIsInstance(app_info['score'], float)
-        self.assertIsInstance(app_info['reviews'], int)
-        
-    def test_fetch_reviews(self):
-        """Test review fetching."""
-        # Test with different review counts
-        for count in [10, 50, 100]:
-            reviews = self.analyzer.fetch_reviews(count=count)
-            
-            # Check if reviews were fetched
-            self.assertIsNotNone(reviews)
-            self.assertIsInstance(reviews, list)
-            self.assertLessEqual(len(reviews), count)
-            
-            # Check review structure
-            if reviews:
-                review = reviews[0]
-                self.assertIn('content', review)
-                self.assertIn('score', review)
-                self.assertIn('userName', review)
-                
-                # Check if score is within valid range
-                self.assertGreaterEqual(review['score'], 1)
-                self.assertLessEqual(review['score'], 5)
-                
-    def test_analyze_sentiment(self):
-        """Test sentiment analysis."""
-        # Test with different types of reviews
-        test_reviews = [
-            "This app is amazing! I love it!",
-            "Terrible app, crashes all the time.",
-            "It's okay, could be better.",
-            "Mixed feelings about this one."
+
+def validate(obj, schema):
+    """Convert obj to schema, failing the test with msgspec's error if it doesn't match."""
+    try:
+        return msgspec.convert(obj, schema)
+    except msgspec.ValidationError as e:
+        pytest.fail(f"Invalid {schema}: {e}")
+
+
+class FakeClaude:
+    """
+    Stands in for AsyncAnthropic, answering every review with a canned analysis
+    and recording the requests it receives.
+    """
+
+    def __init__(self):
+        self.messages = self
+        self.requests = []
+        self.dropped_batch_results = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @staticmethod
+    def analysis(text):
+        return {
+            "sentiment": "positive" if "good" in text else "negative",
+            "topics": ["gameplay"],
+            "issues": [] if "good" in text else [text],
+            "praises": [text] if "good" in text else []
+        }
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0)
+            content = kwargs['messages'][0]['content']
+            if kwargs['tool_choice']['name'] == "record_analyses":
+                texts = json.loads(content[len("Reviews:\n"):])
+                payload = {"results": [self.analysis(t) for t in texts][self.dropped_batch_results:]}
+            else:
+                payload = self.analysis(content[len("Review text: "):])
+            return SimpleNamespace(content=[SimpleNamespace(type="tool_use", input=payload)])
+        finally:
+            self.in_flight -= 1
+
+
+class FakePlayStore:
+    """
+    Stands in for google-play-scraper's app() and reviews(), serving
+    REVIEW_COUNT deterministic reviews newest first and recording the pages
+    requested.
+    """
+
+    REVIEW_COUNT = 250
+    APP_INFO = {
+        "title": "Pokémon GO",
+        "developer": "Niantic, Inc.",
+        "score": 4.1,
+        "reviews": 1000,
+        "installs": "100,000,000+",
+        "contentRating": "Everyone",
+    }
+
+    def __init__(self):
+        self.pages = []
+        newest = datetime(2025, 1, 1)
+        self.all_reviews = [
+            {
+                "reviewId": f"review-{i}",
+                "userName": f"user {i}",
+                "content": f"good game {i}" if i % 5 < 2 else f"crashes on level {i}",
+                "score": 5 - i % 5,
+                "at": newest - timedelta(hours=i),
+            }
+            for i in range(self.REVIEW_COUNT)
         ]
-        
-        for review in test_reviews:
-            analysis = self.analyzer.analyze_sentiment(review)
-            
-            # Check analysis structure
-            self.assertIsInstance(analysis, dict)
-            self.assertIn('sentiment', analysis)
-            self.assertIn('topics', analysis)
-            self.assertIn('issues', analysis)
-            self.assertIn('praises', analysis)
-            
-            # Check sentiment value
-            self.assertIn(analysis['sentiment'], ['positive', 'negative', 'neutral'])
-            
-            # Check if lists are not None
-            self.assertIsInstance(analysis['topics'], list)
-            self.assertIsInstance(analysis['issues'], list)
-            self.assertIsInstance(analysis['praises'], list)
-            
-    def test_analyze_reviews(self):
-        """Test full review analysis."""
-        # Fetch some reviews first
-        self.analyzer.fetch_reviews(count=10)
-        
-        # Run analysis
-        analysis = self.analyzer.analyze_reviews()
-        
-        # Check analysis structure
-        self.assertIsInstance(analysis, dict)
-        self.assertIn('total_reviews', analysis)
-        self.assertIn('average_rating', analysis)
-        self.assertIn('rating_distribution', analysis)
-        self.assertIn('sentiment_distribution', analysis)
-        self.assertIn('common_topics', analysis)
-        self.assertIn('common_issues', analysis)
-        self.assertIn('common_praises', analysis)
-        
-        # Check if values are of correct type
-        self.assertIsInstance(analysis['total_reviews'], int)
-        self.assertIsInstance(analysis['average_rating'], float)
-        self.assertIsInstance(analysis['rating_distribution'], dict)
-        self.assertIsInstance(analysis['sentiment_distribution'], dict)
-        
-    def test_generate_report(self):
-        """Test report generation."""
-        # Generate report
-        report_path = self.analyzer.generate_report()
-        
-        # Check if report file exists
-        self.assertTrue(os.path.exists(report_path))
-        
-        # Check if visualization was created
-        viz_path = report_path.replace('_report.json', '_sentiment.png')
-        self.assertTrue(os.path.exists(viz_path))
-        
-        # Clean up test files
-        os.remove(report_path)
-        os.remove(viz_path)
-        
-    def test_negative_reviews_only(self):
-        """Test negative reviews analysis."""
-        # Fetch reviews and filter for negative ones
-        self.analyzer.fetch_reviews(count=50)
-        negative_reviews = [r for r in self.analyzer.reviews if r.get('score', 0) <= 3]
-        
-        # Check if we got some negative reviews
-        self.assertGreater(len(negative_reviews), 0)
-        
-        # Verify all reviews are negative
-        for review in negative_reviews:
-            self.assertLessEqual(review['score'], 3)
-            
-    def test_error_handling(self):
-        """Test error handling."""
-        # Test with invalid app ID
-        invalid_analyzer = PlayStoreReviewAnalyzer("invalid_app_id")
-        with self.assertRaises(Exception):
+
+    def app(self, app_id, lang='en', country='us'):
+        return dict(self.APP_INFO)
+
+    def reviews(self, app_id, lang='en', country='us', count=100, sort=None, continuation_token=None):
+        start = continuation_token.token if continuation_token is not None else 0
+        end = min(start + count, len(self.all_reviews))
+        self.pages.append((start, end))
+        token = end if end < len(self.all_reviews) else None
+        return [dict(r) for r in self.all_reviews[start:end]], SimpleNamespace(token=token)
+
+
+@pytest.fixture
+def fake_claude():
+    """Fake Claude client, injected with claude= into analyzers of offline tests."""
+    return FakeClaude()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _env():
+    """Load environment variables once per worker, before any analyzer is created."""
+    load_dotenv()
+    yield
+
+
+@pytest.fixture
+def play_store(monkeypatch):
+    """Fake Play Store, patched into the analyzer module for the test."""
+    store = FakePlayStore()
+    monkeypatch.setattr("app_review_analyzer.app", store.app)
+    monkeypatch.setattr("app_review_analyzer.reviews", store.reviews)
+    return store
+
+
+@pytest.fixture(scope="session")
+def sentiment_results(tmp_path_factory):
+    """Analyses of SENTIMENT_TEST_REVIEWS, fetched with a single batched request."""
+    cache_dir = str(tmp_path_factory.mktemp("sentiment_cache"))
+    analyzer = PlayStoreReviewAnalyzer(APP_ID, cache_dir=cache_dir, claude=FakeClaude())
+    results = analyzer.analyze_sentiment_batch(SENTIMENT_TEST_REVIEWS)
+    assert len(results) == len(SENTIMENT_TEST_REVIEWS)
+    return dict(zip(SENTIMENT_TEST_REVIEWS, results))
+
+
+@pytest.fixture
+def analyzer(tmp_path, fake_claude):
+    """
+    Fresh analyzer answered by fake_claude, with its own empty sentiment cache
+    so the requests it makes don't depend on earlier tests.
+    """
+    return PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), claude=fake_claude)
+
+
+def test_initialization(analyzer):
+    """Test if the analyzer is properly initialized."""
+    assert analyzer.app_id == APP_ID
+    assert analyzer.lang == 'en'
+    assert analyzer.country == 'us'
+    assert analyzer.reviews == []
+    assert analyzer.app_info is None
+
+
+def test_fetch_app_info(analyzer, play_store):
+    """Test app info fetching."""
+    app_info = analyzer.fetch_app_info()
+    assert analyzer.app_info is app_info
+
+    # Check required fields and their types
+    validate(app_info, AppInfo)
+
+
+@pytest.mark.parametrize("count", [10, 50, 100])
+def test_fetch_reviews(analyzer, play_store, count):
+    """Test review fetching."""
+    reviews = analyzer.fetch_reviews(count=count)
+
+    # Check if reviews were fetched, newest first, with a single page request
+    assert len(reviews) == count
+    assert analyzer.reviews is reviews
+    assert [r['at'] for r in reviews] == sorted((r['at'] for r in reviews), reverse=True)
+    assert play_store.pages == [(0, count)]
+
+    # Check review structure, including the score range
+    validate(reviews, List[Review])
+
+
+@pytest.mark.parametrize("text", SENTIMENT_TEST_REVIEWS)
+def test_analyze_sentiment(sentiment_results, text):
+    """Test sentiment analysis."""
+    # Check analysis structure and sentiment value
+    validate(sentiment_results[text], SentimentAnalysis)
+
+
+def test_sentiment_cache(tmp_path, fake_claude):
+    """Test that cached analyses are reused for matching reviews."""
+    analyzer = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), claude=fake_claude)
+    cached = {
+        "sentiment": "positive",
+        "topics": ["gameplay"],
+        "issues": [],
+        "praises": ["fun"]
+    }
+    analyzer._remember(analyzer._cache_key("Great game"), cached)
+
+    # Normalized text hits the cache without calling Claude
+    assert analyzer.analyze_sentiment("  great GAME ") == cached
+
+    # The cache survives across analyzer instances
+    reloaded = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), claude=fake_claude)
+    assert reloaded.analyze_sentiment("great game") == cached
+
+    # The cache file is only rewritten when there are new entries
+    cache_path = os.path.join(str(tmp_path), "sentiment_cache.json")
+    inode = os.stat(cache_path).st_ino
+    reloaded.save_cache()
+    assert os.stat(cache_path).st_ino == inode
+
+    # Analyzers saving concurrently keep each other's entries
+    other = {**cached, "sentiment": "negative"}
+    analyzer._remember(analyzer._cache_key("Too many ads"), other)
+    reloaded._remember(reloaded._cache_key("Crashes on start"), other)
+    analyzer.save_cache()
+    reloaded.save_cache()
+    merged = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), claude=fake_claude)
+    assert merged.analyze_sentiment("too many ads") == other
+    assert merged.analyze_sentiment("crashes on start") == other
+    assert fake_claude.requests == []
+
+
+def test_analyze_sentiment_batch_offline(tmp_path, fake_claude):
+    """Test that several reviews are analyzed with a single request."""
+    analyzer = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), claude=fake_claude)
+    texts = ["good game", "laggy", "good graphics"]
+
+    assert analyzer.analyze_sentiment_batch(texts) == [FakeClaude.analysis(t) for t in texts]
+    assert [r['tool_choice']['name'] for r in fake_claude.requests] == ["record_analyses"]
+
+    # Analyzed reviews are served from the cache afterwards
+    assert analyzer.analyze_sentiment_batch(texts) == [FakeClaude.analysis(t) for t in texts]
+    assert len(fake_claude.requests) == 1
+
+
+def test_analyze_sentiment_batch_multiline(tmp_path, fake_claude):
+    """Test that reviews spanning several lines stay one review each."""
+    analyzer = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), claude=fake_claude)
+    texts = ["good game\n2. but laggy", "crashes"]
+
+    assert analyzer.analyze_sentiment_batch(texts) == [FakeClaude.analysis(t) for t in texts]
+    assert [r['tool_choice']['name'] for r in fake_claude.requests] == ["record_analyses"]
+
+
+def test_analyze_sentiment_batch_mismatch(tmp_path, fake_claude):
+    """Test that reviews are analyzed one by one when a batch response is incomplete."""
+    fake_claude.dropped_batch_results = 1
+    analyzer = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), claude=fake_claude)
+    texts = ["good game", "laggy", "good graphics"]
+
+    assert analyzer.analyze_sentiment_batch(texts) == [FakeClaude.analysis(t) for t in texts]
+    assert [r['tool_choice']['name'] for r in fake_claude.requests] == ["record_analyses"] + ["record_analysis"] * 3
+
+    # Batches get more time than single reviews, as they produce more output
+    assert fake_claude.requests[0]['timeout'] > fake_claude.requests[1]['timeout'] > REQUEST_TIMEOUT
+
+
+def test_analyze_sentiment_batch_chunking(tmp_path, fake_claude):
+    """Test that a large batch is split into BATCH_SIZE requests within the concurrency limit."""
+    analyzer = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), claude=fake_claude)
+    texts = [f"good review {i}" for i in range(300)]
+
+    assert analyzer.analyze_sentiment_batch(texts) == [FakeClaude.analysis(t) for t in texts]
+    assert len(fake_claude.requests) == 300 // BATCH_SIZE
+    assert fake_claude.max_in_flight <= MAX_CONCURRENT_REQUESTS
+
+    # Incomplete responses fall back to single requests within the same limit
+    fake_claude.dropped_batch_results = 1
+    fallback = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path / "fallback"), claude=fake_claude)
+    assert fallback.analyze_sentiment_batch(texts) == [FakeClaude.analysis(t) for t in texts]
+    assert fake_claude.max_in_flight <= MAX_CONCURRENT_REQUESTS
+
+
+def test_analyze_reviews_duplicates(tmp_path, fake_claude):
+    """Test that duplicate reviews are analyzed once and counted once per review."""
+    analyzer = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), claude=fake_claude)
+    analyzer.reviews = [
+        {"content": "good game", "score": 5},
+        {"content": " good game ", "score": 4},
+        {"content": "good game", "score": 5},
+        {"content": "laggy", "score": 2},
+    ]
+
+    analysis = analyzer.analyze_reviews()
+    assert len(fake_claude.requests) == 1
+    assert fake_claude.requests[0]['messages'][0]['content'] == 'Reviews:\n["good game", "laggy"]'
+    assert analysis['sentiment_distribution'] == {"positive": 3, "neutral": 0, "negative": 1}
+    assert analysis['common_topics'] == {"gameplay": 4}
+    assert analysis['common_praises'] == {"good game": 3}
+    assert analysis['rating_distribution'] == {2: 1, 4: 1, 5: 2}
+
+
+def test_analyze_reviews_concurrency(tmp_path, fake_claude):
+    """Test that failed batches fall back to single requests within the concurrency limit."""
+    fake_claude.dropped_batch_results = 1
+    analyzer = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), claude=fake_claude)
+    analyzer.reviews = [{"content": f"good review {i}", "score": 5} for i in range(200)]
+
+    analysis = analyzer.analyze_reviews()
+    assert analysis['sentiment_distribution']['positive'] == 200
+    assert len(fake_claude.requests) == 10 + 200
+    assert fake_claude.max_in_flight == MAX_CONCURRENT_REQUESTS
+
+
+class FakeEncoder:
+    """Stands in for a SentenceTransformer, with fixed embeddings per text."""
+
+    def __init__(self, vectors):
+        self.vectors = {text: np.asarray(v, dtype=np.float32) / np.linalg.norm(v) for text, v in vectors.items()}
+
+    def encode(self, text, normalize_embeddings=True):
+        return self.vectors[text]
+
+
+def test_semantic_cache(tmp_path, fake_claude):
+    """Test that near-duplicate reviews reuse cached analyses."""
+    encoder = FakeEncoder({
+        "Great game": [1.0, 0.0, 0.0],
+        "Really great game": [0.98, 0.2, 0.0],
+        "Too many ads": [0.0, 1.0, 0.0],
+        "Way too many ads": [0.0, 0.98, 0.2],
+        "Crashes on start": [0.0, 0.0, 1.0],
+        "Crashes right on start": [0.2, 0.0, 0.98],
+    })
+    analyzer = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), semantic_cache=True,
+                                       claude=fake_claude, encoder=encoder)
+    cached = {
+        "sentiment": "positive",
+        "topics": ["gameplay"],
+        "issues": [],
+        "praises": ["fun"]
+    }
+    analyzer._remember(analyzer._cache_key("Great game"), cached, encoder.encode("Great game"))
+
+    # A similar review hits the cache without calling Claude
+    assert analyzer.analyze_sentiment("Really great game") == cached
+
+    # Embeddings are stored alongside the cache and reloaded
+    reloaded = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), semantic_cache=True,
+                                       claude=fake_claude, encoder=encoder)
+    assert reloaded.analyze_sentiment("Really great game") == cached
+
+    # Analyzers saving concurrently keep each other's embeddings
+    other = {**cached, "sentiment": "negative"}
+    first = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), semantic_cache=True,
+                                    claude=fake_claude, encoder=encoder)
+    second = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), semantic_cache=True,
+                                     claude=fake_claude, encoder=encoder)
+    second._remember(second._cache_key("Too many ads"), other, encoder.encode("Too many ads"))
+    second.save_cache()
+    first._remember(first._cache_key("Crashes on start"), other, encoder.encode("Crashes on start"))
+    first.save_cache()
+    merged = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), semantic_cache=True,
+                                     claude=fake_claude, encoder=encoder)
+    assert merged.analyze_sentiment("Way too many ads") == other
+    assert merged.analyze_sentiment("Crashes right on start") == other
+    assert fake_claude.requests == []
+
+
+def test_analyze_reviews(analyzer, play_store):
+    """Test full review analysis."""
+    analyzer.fetch_reviews(count=10)
+
+    # Run analysis
+    analysis = analyzer.analyze_reviews()
+
+    # Check analysis structure and value types
+    validate(analysis, AnalysisReport)
+
+    # Analysis is memoized until the reviews change
+    assert analyzer.analyze_reviews() is analysis
+    analyzer.reviews = analyzer.reviews[:5]
+    assert analyzer.analyze_reviews()['total_reviews'] == len(analyzer.reviews)
+
+
+def test_generate_report(tmp_path, fake_claude, capsys):
+    """Test report generation."""
+    analyzer = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), claude=fake_claude)
+    analyzer.app_info = {"title": "Pokémon GO", "developer": "Niantic, Inc.", "score": 4.1, "reviews": 1000}
+    analyzer.reviews = [
+        {"content": "good game", "score": 5, "userName": "a"},
+        {"content": "laggy", "score": 2, "userName": "b"},
+        {"content": "good graphics", "score": 4, "userName": "c"},
+    ]
+
+    # Generate report into memory, nothing touches disk
+    buf_png, buf_json = io.BytesIO(), io.StringIO()
+    report_path = analyzer.generate_report(output_dir=str(tmp_path / "reports"), report_stream=buf_json, viz_stream=buf_png)
+    assert report_path is None
+    assert not os.path.exists(tmp_path / "reports")
+
+    # Check if the report was written
+    report = json.loads(buf_json.getvalue())
+    assert report['app_info']['title'] == "Pokémon GO"
+    assert report['analysis']['total_reviews'] == 3
+    assert report['analysis']['rating_distribution'] == {"2": 1, "4": 1, "5": 1}
+    assert report['analysis']['sentiment_distribution'] == {"positive": 2, "neutral": 0, "negative": 1}
+    assert report['analysis']['common_issues'] == {"laggy": 1}
+
+    # Check if visualization was created; exporting it needs Chrome for Kaleido
+    if buf_png.getbuffer().nbytes == 0 and "Kaleido requires Google Chrome" in capsys.readouterr().out:
+        pytest.skip("Kaleido can't find Chrome to export the visualization")
+    assert buf_png.getbuffer().nbytes > 0
+
+
+def test_report_index(tmp_path):
+    """Test that the report index is built from reports and kept up to date."""
+    reports_dir = str(tmp_path)
+    with open(os.path.join(reports_dir, f"{APP_ID}_report.json"), 'w') as f:
+        json.dump({"app_info": {"title": "Pokémon GO"}, "generated_at": "2025-01-01T00:00:00"}, f)
+
+    # Index is built from existing reports on first use, back-filling their meta files
+    assert load_report_index(reports_dir) == [
+        {"app_id": APP_ID, "app_name": "Pokémon GO", "date": "2025-01-01T00:00:00"}
+    ]
+    assert os.path.exists(os.path.join(reports_dir, f"{APP_ID}_report.meta.json"))
+
+    # Newer entries go first and replace older ones for the same app
+    update_report_index({"app_id": "com.example", "app_name": "Example", "date": "2025-02-01T00:00:00"}, reports_dir)
+    update_report_index({"app_id": APP_ID, "app_name": "Pokémon GO", "date": "2025-03-01T00:00:00"}, reports_dir)
+    index = load_report_index(reports_dir)
+    assert [e['app_id'] for e in index] == [APP_ID, "com.example"]
+    assert index[0]['date'] == "2025-03-01T00:00:00"
+
+
+def test_report_index_refresh(tmp_path):
+    """Test that reports added, changed or removed outside the analyzer show up in the index."""
+    reports_dir = str(tmp_path)
+    index_path = os.path.join(reports_dir, "_index.json")
+
+    def write_report(app_id, title, date):
+        with open(os.path.join(reports_dir, f"{app_id}_report.json"), 'w') as f:
+            json.dump({"app_info": {"title": title}, "generated_at": date}, f)
+
+    def age_index():
+        # Date the index before the latest change to the directory, as after a git pull
+        mtime = min(os.stat(reports_dir).st_mtime_ns, os.stat(index_path).st_mtime_ns) - 10**9
+        os.utime(index_path, ns=(mtime, mtime))
+
+    write_report(APP_ID, "Pokémon GO", "2025-01-01T00:00:00")
+    assert [e['app_id'] for e in load_report_index(reports_dir)] == [APP_ID]
+
+    # A report added later is picked up
+    write_report("com.example", "Example", "2025-02-01T00:00:00")
+    age_index()
+    assert [e['app_id'] for e in load_report_index(reports_dir)] == ["com.example", APP_ID]
+
+    # A changed report refreshes its meta file
+    write_report(APP_ID, "Pokémon GO!", "2025-03-01T00:00:00")
+    meta_path = os.path.join(reports_dir, f"{APP_ID}_report.meta.json")
+    os.utime(meta_path, ns=(0, 0))
+    age_index()
+    assert load_report_index(reports_dir)[0] == {"app_id": APP_ID, "app_name": "Pokémon GO!", "date": "2025-03-01T00:00:00"}
+
+    # A deleted report drops out
+    os.remove(os.path.join(reports_dir, "com.example_report.json"))
+    age_index()
+    assert [e['app_id'] for e in load_report_index(reports_dir)] == [APP_ID]
+
+
+def test_negative_reviews_only(analyzer, play_store):
+    """Test negative reviews analysis."""
+    analyzer.fetch_reviews(count=100)
+
+    # Filter the fetched reviews for negative ones
+    mask = analyzer.scores <= 3
+    negative_reviews = [analyzer.reviews[i] for i in np.nonzero(mask)[0]]
+
+    # Check if we got some negative reviews
+    assert mask.any()
+    assert len(negative_reviews) == int(mask.sum())
+
+    # Verify all reviews are negative
+    for review in negative_reviews:
+        assert review['score'] <= 3
+
+
+def test_scores(tmp_path, fake_claude):
+    """Test that review scores are kept as an int8 array in review order."""
+    analyzer = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), claude=fake_claude)
+    analyzer.reviews = [{"content": f"review {i}", "score": score} for i, score in enumerate([5, 3, 1, 4, 2, 5])]
+
+    assert analyzer.scores.dtype == np.int8
+    assert analyzer.scores.tolist() == [5, 3, 1, 4, 2, 5]
+
+    # The mask selects exactly the reviews scored 3 or lower
+    mask = analyzer.scores <= 3
+    assert [analyzer.reviews[i]['content'] for i in np.nonzero(mask)[0]] == ["review 1", "review 2", "review 4"]
+
+
+def test_fetch_reviews_score_filter(analyzer, play_store):
+    """Test fetching only reviews that pass a score filter."""
+    reviews = analyzer.fetch_reviews(count=20, score_filter=lambda score: score <= 3)
+
+    # Three in five reviews pass, so a second page is needed
+    assert len(reviews) == 20
+    assert play_store.pages == [(0, 20), (20, 40)]
+    for review in reviews:
+        assert review['score'] <= 3
+
+
+def test_error_handling(tmp_path, fake_claude):
+    """Test error handling."""
+    analyzer = PlayStoreReviewAnalyzer(APP_ID, cache_dir=str(tmp_path), claude=fake_claude)
+
+    # Test with invalid app ID, failing in the scraper without a request
+    invalid_analyzer = PlayStoreReviewAnalyzer("invalid_app_id", cache_dir=str(tmp_path), claude=fake_claude)
+    with patch("app_review_analyzer.app", side_effect=NotFoundError("App not found(404).")):
+        with pytest.raises(Exception):
             invalid_analyzer.fetch_app_info()
-            
-        # Test sentiment analysis with empty text
-        analysis = self.analyzer.analyze_sentiment("")
-        self.assertIsInstance(analysis, dict)
-        self.assertIn('sentiment', analysis)
-        
-        # Test review analysis without fetching reviews
-        analyzer = PlayStoreReviewAnalyzer(self.app_id)
-        with self.assertRaises(ValueError):
-            analyzer.analyze_reviews()
-
-if __name__ == '__main__':
-    unittest.main(verbosity=2) 
\ No newline at end of file
+
+    # Test sentiment analysis with empty text
+    analysis = analyzer.analyze_sentiment("")
+    assert isinstance(analysis, dict)
+    assert 'sentiment' in analysis
+
+    # Test review analysis without fetching reviews
+    with pytest.raises(ValueError):
+        analyzer.analyze_reviews()
+
+
+@pytest.mark.network
+@pytest.mark.timeout(30)
+@pytest.mark.flaky(reruns=2)
+def test_invalid_app_id_network():
+    """Smoke test that the Play Store itself rejects an invalid app ID (nightly only)."""
+    invalid_analyzer = PlayStoreReviewAnalyzer("invalid_app_id")
+    with pytest.raises(Exception):
+        invalid_analyzer.fetch_app_info()